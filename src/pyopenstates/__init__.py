@@ -2,6 +2,9 @@
 
 """A Python client for the Open States API"""
 
+import importlib
+from typing import TYPE_CHECKING
+
 from .config import (  # noqa
     __version__,
     API_ROOT,
@@ -9,17 +12,64 @@ from .config import (  # noqa
     API_KEY_ENV_VAR,
     ENVIRON_API_KEY,
 )
-from .core import (  # noqa
-    APIError,
-    NotFound,
-    set_user_agent,
-    set_api_key,
-    get_metadata,
-    get_organizations,
-    search_bills,
-    get_bill,
-    search_legislators,
-    get_legislator,
-    locate_legislators,
-    search_districts,
+
+# the API client is loaded on first use to keep `import pyopenstates` fast
+_CORE_NAMES = (
+    "APIError",
+    "NotFound",
+    "set_user_agent",
+    "set_api_key",
+    "get_metadata",
+    "get_organizations",
+    "search_bills",
+    "iter_bills",
+    "get_bill",
+    "hydrate_bills",
+    "search_legislators",
+    "iter_legislators",
+    "get_legislator",
+    "locate_legislators",
+    "locate_legislators_many",
+    "search_districts",
 )
+__all__ = [
+    "__version__",
+    "API_ROOT",
+    "DEFAULT_USER_AGENT",
+    "API_KEY_ENV_VAR",
+    "ENVIRON_API_KEY",
+    *_CORE_NAMES,
+]
+_SUBMODULES = ("config", "core", "districts", "downloads", "export", "search")
+
+if TYPE_CHECKING:
+    from .core import (  # noqa
+        APIError,
+        NotFound,
+        set_user_agent,
+        set_api_key,
+        get_metadata,
+        get_organizations,
+        search_bills,
+        iter_bills,
+        get_bill,
+        hydrate_bills,
+        search_legislators,
+        iter_legislators,
+        get_legislator,
+        locate_legislators,
+        locate_legislators_many,
+        search_districts,
+    )
+
+
+def __getattr__(name):
+    if name in _CORE_NAMES:
+        return getattr(importlib.import_module(".core", __name__), name)
+    elif name in _SUBMODULES:
+        return importlib.import_module(f".{name}", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_CORE_NAMES) | set(_SUBMODULES))
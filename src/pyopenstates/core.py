@@ -1,7 +1,10 @@
+import contextlib
+import json
+import os
+import threading
 import warnings
-import dateutil.parser
-from requests import Session
-from time import sleep
+from datetime import date
+from time import monotonic, sleep
 from .config import (  # noqa
     __version__,
     API_ROOT,
@@ -10,14 +13,34 @@ from .config import (  # noqa
     ENVIRON_API_KEY,
 )
 
+# requests and the shared session are only set up on first use, keeping
+# `import pyopenstates` cheap and free of side effects
+_session = None
+_session_lock = threading.Lock()
 
-session = Session()
-session.headers.update({"Accept": "application/json"})
-session.headers.update({"User-Agent": DEFAULT_USER_AGENT})
-if ENVIRON_API_KEY:
-    session.headers.update({"X-Api-Key": ENVIRON_API_KEY})
-else:
-    warnings.warn(f"Warning: No API Key found, set {API_KEY_ENV_VAR}")
+
+def _get_session(warn=True):
+    global _session
+    # the first request may come from several worker threads at once
+    with _session_lock:
+        if _session is None:
+            from requests import Session
+
+            session = Session()
+            session.headers.update({"Accept": "application/json"})
+            session.headers.update({"User-Agent": DEFAULT_USER_AGENT})
+            if ENVIRON_API_KEY:
+                session.headers.update({"X-Api-Key": ENVIRON_API_KEY})
+            elif warn:
+                warnings.warn(f"Warning: No API Key found, set {API_KEY_ENV_VAR}")
+            _session = session
+    return _session
+
+
+def __getattr__(name):
+    if name == "session":
+        return _get_session()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 class APIError(RuntimeError):
@@ -34,11 +57,57 @@ class NotFound(APIError):
     pass
 
 
+_TRANSIENT_STATUSES = (429, 500, 502, 503, 504)
+
+
+class _RateLimiter:
+    """Spaces out calls from any number of threads to a maximum rate"""
+
+    def __init__(self, requests_per_second):
+        self.interval = 1.0 / requests_per_second if requests_per_second else 0
+        self.lock = threading.Lock()
+        self.next_time = 0.0
+
+    def wait(self):
+        with self.lock:
+            now = monotonic()
+            delay = self.next_time - now
+            self.next_time = max(now, self.next_time) + self.interval
+        if delay > 0:
+            sleep(delay)
+
+
 def _make_params(**kwargs):
     return {k: v for k, v in kwargs.items() if v is not None}
 
 
-def _get(uri, params=None):
+def _convert_timestamps(result):
+    """Converts a string timestamps from an api result API to a datetime"""
+    import dateutil.parser
+
+    if isinstance(result, dict):
+        for key in result.keys():
+            if key in (
+                "created_at",
+                "updated_at",
+                "latest_people_update",
+                "latest_bill_update",
+            ):
+                try:
+                    result[key] = dateutil.parser.parse(result[key])
+                except (TypeError, ValueError):
+                    pass
+            elif isinstance(result[key], dict):
+                result[key] = _convert_timestamps(result[key])
+            elif isinstance(result[key], list):
+                result[key] = [_convert_timestamps(r) for r in result[key]]
+    elif isinstance(result, list):
+        result = [_convert_timestamps(r) for r in result]
+
+    return result
+
+
+def _get(uri, params=None, retries=0, backoff=1):
     """
     An internal method for making API calls and error handling easy and
     consistent
@@ -46,59 +115,50 @@ def _get(uri, params=None):
     Args:
         uri: API URI
         params: GET parameters
+        retries: Number of times to retry connection errors, rate limiting,
+            and server errors
+        backoff: Seconds to wait before the first retry, doubling each time
 
     Returns:
         JSON as a Python dictionary
     """
 
-    def _convert_timestamps(result):
-        """Converts a string timestamps from an api result API to a datetime"""
-        if isinstance(result, dict):
-            for key in result.keys():
-                if key in (
-                    "created_at",
-                    "updated_at",
-                    "latest_people_update",
-                    "latest_bill_update",
-                ):
-                    try:
-                        result[key] = dateutil.parser.parse(result[key])
-                    except ValueError:
-                        pass
-                elif isinstance(result[key], dict):
-                    result[key] = _convert_timestamps(result[key])
-                elif isinstance(result[key], list):
-                    result[key] = [_convert_timestamps(r) for r in result[key]]
-        elif isinstance(result, list):
-            result = [_convert_timestamps(r) for r in result]
-
-        return result
-
     def _convert(result):
         """Convert results to standard Python data structures"""
         result = _convert_timestamps(result)
         return result
 
+    from requests import RequestException
+
+    session = _get_session()
     url = f"{API_ROOT}/{uri}"
-    response = session.get(url, params=params)
-    if response.status_code != 200:
-        if response.status_code == 404:
-            raise NotFound(f"Not found: {response.url}")
+    for attempt in range(retries + 1):
+        last_attempt = attempt == retries
+        try:
+            response = session.get(url, params=params)
+        except RequestException:
+            if last_attempt:
+                raise
         else:
-            raise APIError(response.text)
-    return _convert(response.json())
+            if response.status_code == 200:
+                return _convert(response.json())
+            elif response.status_code == 404:
+                raise NotFound(f"Not found: {response.url}")
+            elif last_attempt or response.status_code not in _TRANSIENT_STATUSES:
+                raise APIError(response.text)
+        sleep(backoff * 2**attempt)
 
 
 def set_user_agent(user_agent):
     """Appends a custom string to the default User-Agent string
     (e.g. ``pyopenstates/__version__ user_agent``)"""
-    session.headers.update({"User-Agent": f"{DEFAULT_USER_AGENT} {user_agent}"})
+    _get_session().headers.update({"User-Agent": f"{DEFAULT_USER_AGENT} {user_agent}"})
 
 
 def set_api_key(apikey):
     """Sets API key. Can also be set as OPENSTATES_API_KEY environment
     variable."""
-    session.headers["X-Api-Key"] = apikey
+    _get_session(warn=False).headers["X-Api-Key"] = apikey
 
 
 def get_metadata(state=None, include=None, fields=None):
@@ -155,7 +215,7 @@ def _alt_parameter(param, other_param, param_name, other_param_name):
     return param
 
 
-def search_bills(
+def _bill_search_args(
     jurisdiction=None,
     identifier=None,
     session=None,
@@ -168,28 +228,19 @@ def search_bills(
     sponsor=None,
     sponsor_classification=None,
     q=None,
-    # control params
     sort=None,
     include=None,
-    page=1,
-    per_page=10,
-    all_pages=True,
-    # alternate names for other parameters
     state=None,
 ):
-    """
-    Find bills matching a given set of filters
-
-    For a list of each field, example values, etc. see
-    https://v3.openstates.org/docs#/bills/bills_search_bills_get
-    """
-    uri = "bills/"
+    """builds the GET parameters for a bill search"""
     args = {}
 
     jurisdiction = _alt_parameter(state, jurisdiction, "state", "jurisdiction")
 
     if jurisdiction:
         args["jurisdiction"] = jurisdiction
+    if identifier:
+        args["identifier"] = identifier
     if session:
         args["session"] = session
     if chamber:
@@ -215,29 +266,187 @@ def search_bills(
     if include:
         args["include"] = include
 
-    results = []
+    return args
+
+
+def iter_bills(retries=3, checkpoint=None, **kwargs):
+    """
+    Find bills matching a given set of filters, yielding each bill as its
+    page of results arrives
+
+    Accepts the same filters as `search_bills`, and always fetches all pages,
+    so large result sets can be processed without holding them in memory.
+    """
+    args = _bill_search_args(**kwargs)
+    args["per_page"] = 20
+    for page_results in _paginate(
+        "bills/", args, retries=retries, checkpoint=checkpoint
+    ):
+        yield from page_results
+
+
+def search_bills(
+    jurisdiction=None,
+    identifier=None,
+    session=None,
+    chamber=None,
+    classification=None,
+    subject=None,
+    updated_since=None,
+    created_since=None,
+    action_since=None,
+    sponsor=None,
+    sponsor_classification=None,
+    q=None,
+    # control params
+    sort=None,
+    include=None,
+    page=1,
+    per_page=10,
+    all_pages=True,
+    retries=3,
+    checkpoint=None,
+    # alternate names for other parameters
+    state=None,
+):
+    """
+    Find bills matching a given set of filters
+
+    For a list of each field, example values, etc. see
+    https://v3.openstates.org/docs#/bills/bills_search_bills_get
+
+    When fetching ``all_pages``, transient errors are retried up to
+    ``retries`` times with exponential backoff. If ``checkpoint`` is given,
+    each page is recorded in that file as it is fetched, and a later call with
+    the same parameters resumes after the last recorded page instead of
+    starting over. The checkpoint file is removed once all pages are fetched.
+    A checkpoint can only be used with ``all_pages``.
+    """
+    if checkpoint and not all_pages:
+        raise ValueError("checkpoint requires all_pages")
+    uri = "bills/"
+    args = _bill_search_args(
+        jurisdiction=jurisdiction,
+        identifier=identifier,
+        session=session,
+        chamber=chamber,
+        classification=classification,
+        subject=subject,
+        updated_since=updated_since,
+        created_since=created_since,
+        action_since=action_since,
+        sponsor=sponsor,
+        sponsor_classification=sponsor_classification,
+        q=q,
+        sort=sort,
+        include=include,
+        state=state,
+    )
 
     if all_pages:
         args["per_page"] = 20
-        args["page"] = 1
+        results = []
+        for page_results in _paginate(
+            uri, args, retries=retries, checkpoint=checkpoint
+        ):
+            results += page_results
+        return results
     else:
         args["per_page"] = per_page
         args["page"] = page
+        return _get(uri, params=args, retries=retries)["results"]
 
-    resp = _get(uri, params=args)
-    results += resp["results"]
 
-    if all_pages:
-        while resp["pagination"]["page"] < resp["pagination"]["max_page"]:
-            args["page"] += 1
+def _json_default(obj):
+    if isinstance(obj, date):
+        return obj.isoformat()
+    raise TypeError(f"{type(obj).__name__} is not JSON serializable")
+
+
+def _open_checkpoint(checkpoint, params):
+    """
+    Opens a checkpoint file positioned after its header, or returns None if
+    there is no usable checkpoint to resume from
+    """
+    try:
+        f = open(checkpoint, "r+b")
+    except FileNotFoundError:
+        return None
+    try:
+        saved_params = json.loads(f.readline())["params"]
+    except (KeyError, TypeError, ValueError):
+        f.close()
+        return None
+    if saved_params != json.loads(json.dumps(params, default=_json_default)):
+        f.close()
+        raise ValueError(
+            f"checkpoint {checkpoint} was created with different parameters"
+        )
+    return f
+
+
+def _read_checkpoint(f):
+    """
+    Yields the page records of an open checkpoint file one line at a time,
+    truncating a partially written final line from an interrupted run
+    """
+    while True:
+        offset = f.tell()
+        line = f.readline()
+        if not line:
+            return
+        if not line.endswith(b"\n"):
+            f.truncate(offset)
+            return
+        yield json.loads(line)
+
+
+def _paginate(uri, params, retries=0, checkpoint=None):
+    """
+    Yields the list of results from each page of a paginated API call
+
+    Args:
+        uri: API URI
+        params: GET parameters, excluding ``page``
+        retries: Number of times to retry transient errors on each page
+        checkpoint: Optional path of a file to record progress in, so that an
+            interrupted pull can be resumed
+    """
+    params = dict(params)
+    page = 0
+    max_page = 1
+
+    saved = _open_checkpoint(checkpoint, params) if checkpoint else None
+    if saved is not None:
+        with saved:
+            for record in _read_checkpoint(saved):
+                page, max_page = record["page"], record["max_page"]
+                yield _convert_timestamps(record["results"])
+    elif checkpoint:
+        # written atomically, so a crash can't leave a partial header behind
+        header = json.dumps({"uri": uri, "params": params}, default=_json_default)
+        with open(f"{checkpoint}.tmp", "w") as f:
+            f.write(header + "\n")
+        os.replace(f"{checkpoint}.tmp", checkpoint)
+
+    while page < max_page:
+        if page:
             sleep(1)
-            resp = _get(uri, params=args)
-            results += resp["results"]
+        params["page"] = page + 1
+        resp = _get(uri, params=params, retries=retries)
+        page = resp["pagination"]["page"]
+        max_page = resp["pagination"]["max_page"]
+        if checkpoint:
+            with open(checkpoint, "a") as f:
+                record = dict(page=page, max_page=max_page, results=resp["results"])
+                f.write(json.dumps(record, default=_json_default) + "\n")
+        yield resp["results"]
 
-    return results
+    if checkpoint:
+        os.remove(checkpoint)
 
 
-def get_bill(uid=None, state=None, session=None, bill_id=None, include=None):
+def get_bill(uid=None, state=None, session=None, bill_id=None, include=None, retries=0):
     """
     Returns details of a specific bill Can be identified by the Open States
     unique bill id (uid), or by specifying the state, session, and
@@ -250,6 +459,7 @@ def get_bill(uid=None, state=None, session=None, bill_id=None, include=None):
         bill_id: Yhe legislative bill ID (e.g. ``HR 42``)
         **kwargs: Optional keyword argument options, such as ``fields``,
         which specifies the fields to return
+        retries: Number of times to retry transient errors
 
     Returns:
         The :ref:`Bill` details as a dictionary
@@ -263,14 +473,147 @@ def get_bill(uid=None, state=None, session=None, bill_id=None, include=None):
                 "state, session, and bill ID"
             )
         uid = _fix_id_string("ocd-bill/", uid)
-        return _get(f"bills/{uid}", params=args)
+        return _get(f"bills/{uid}", params=args, retries=retries)
     else:
         if not state or not session or not bill_id:
             raise ValueError(
                 "Must specify an Open States bill (uid), "
                 "or the state, session, and bill ID"
             )
-        return _get(f"bills/{state.lower()}/{session}/{bill_id}", params=args)
+        return _get(
+            f"bills/{state.lower()}/{session}/{bill_id}", params=args, retries=retries
+        )
+
+
+def _bounded_map(
+    fn, items, max_workers=4, requests_per_second=1, ordered=True, cached=None
+):
+    """
+    Calls ``fn`` on each item from a pool of threads, yielding
+    ``(item, result)`` pairs
+
+    Only a bounded number of calls are in flight at once, so any size of input
+    can be streamed, and stopping early or an error doesn't leave every
+    remaining call queued.
+
+    Args:
+        fn: The function to call with each item
+        items: An iterable of items
+        max_workers: Maximum number of concurrent calls
+        requests_per_second: Maximum rate of calls, or None for no limit
+        ordered: Whether to yield results in the order of ``items``, or as
+            soon as they are ready
+        cached: An optional function returning an item's already known
+            result, or None if ``fn`` needs to be called
+    """
+    from collections import deque
+    from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+
+    limiter = _RateLimiter(requests_per_second)
+
+    def _call(item):
+        limiter.wait()
+        return fn(item)
+
+    def _drain(size):
+        """
+        yields finished calls until no more than size are pending, and any
+        that are already finished at the head of the queue when ordered
+        """
+        while pending and (len(pending) > size or (ordered and pending[0].done())):
+            if ordered:
+                future = pending.popleft()
+                yield submitted.pop(future), future.result()
+            else:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pending.remove(future)
+                    yield submitted.pop(future), future.result()
+
+    pending = deque()
+    submitted = {}
+    window = max_workers * 2
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        for item in items:
+            result = cached(item) if cached is not None else None
+            if result is None:
+                future = executor.submit(_call, item)
+            elif ordered and pending:
+                # wait for the items ahead of it to keep the order
+                future = Future()
+                future.set_result(result)
+            else:
+                yield item, result
+                continue
+            submitted[future] = item
+            pending.append(future)
+            yield from _drain(window)
+        yield from _drain(0)
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+def hydrate_bills(
+    bills,
+    include=None,
+    max_workers=4,
+    requests_per_second=1,
+    ordered=True,
+    cache=None,
+    retries=3,
+):
+    """
+    Fetches full details for many bills concurrently
+
+    Args:
+        bills: An iterable of bill summaries (e.g. from `search_bills` or
+            `iter_bills`) or Open States bill IDs
+        include: Additional includes, passed to `get_bill`
+        max_workers: Maximum number of concurrent requests
+        requests_per_second: Maximum request rate, or None for no limit
+        ordered: Whether to yield bills in the order given, or as soon as
+            they are fetched
+        cache: An optional dictionary-like object (such as a `shelve`)
+            mapping bill IDs to previously fetched details. Summaries whose
+            ``updated_at`` matches the cached copy are not re-fetched, and
+            fetched details are stored back into it. Only reuse a cache with
+            the same ``include``.
+        retries: Number of times to retry transient errors for each bill
+
+    Yields:
+        The :ref:`Bill` details as dictionaries
+    """
+
+    def _bill_ids():
+        for bill in bills:
+            if isinstance(bill, str):
+                uid, updated_at = _fix_id_string("ocd-bill/", bill), None
+            else:
+                uid, updated_at = bill["id"], bill.get("updated_at")
+            cached = None
+            if cache is not None and updated_at is not None:
+                cached = cache.get(uid)
+                if cached is not None and cached.get("updated_at") != updated_at:
+                    cached = None
+            yield uid, cached
+
+    def _fetch(item):
+        return get_bill(item[0], include=include, retries=retries)
+
+    results = _bounded_map(
+        _fetch,
+        _bill_ids(),
+        max_workers=max_workers,
+        requests_per_second=requests_per_second,
+        ordered=ordered,
+        cached=lambda item: item[1],
+    )
+    with contextlib.closing(results):
+        for (uid, cached), detail in results:
+            if cache is not None and cached is None:
+                cache[uid] = detail
+            yield detail
 
 
 def search_legislators(
@@ -299,6 +642,35 @@ def search_legislators(
     return _get("people", params)["results"]
 
 
+def iter_legislators(
+    jurisdiction=None,
+    name=None,
+    id_=None,
+    org_classification=None,
+    district=None,
+    include=None,
+    retries=3,
+):
+    """
+    Search for legislators, yielding each legislator from every page of
+    results
+
+    Returns:
+        An iterator of matching :ref:`Legislator` dictionaries
+    """
+    params = _make_params(
+        jurisdiction=jurisdiction,
+        name=name,
+        id=id_,
+        org_classification=org_classification,
+        district=district,
+        include=include,
+        per_page=50,
+    )
+    for page_results in _paginate("people", params, retries=retries):
+        yield from page_results
+
+
 def get_legislator(leg_id):
     """
     Gets a legislator's details
@@ -314,7 +686,7 @@ def get_legislator(leg_id):
     return _get("people/", params={"id": [leg_id]})["results"][0]
 
 
-def locate_legislators(lat, lng, fields=None):
+def locate_legislators(lat, lng, fields=None, retries=0):
     """
     Returns a list of legislators for the given latitude/longitude coordinates
 
@@ -322,16 +694,79 @@ def locate_legislators(lat, lng, fields=None):
         lat: Latitude
         long: Longitude
         fields: An optional custom list of fields to return
+        retries: Number of times to retry transient errors
 
     Returns:
         A list of matching :ref:`Legislator` dictionaries
 
     """
     return _get(
-        "people.geo/", params=dict(lat=float(lat), lng=float(lng), fields=fields)
+        "people.geo/",
+        params=dict(lat=float(lat), lng=float(lng), fields=fields),
+        retries=retries,
     )["results"]
 
 
+def locate_legislators_many(
+    points,
+    precision=4,
+    fields=None,
+    max_workers=4,
+    requests_per_second=1,
+    cache=None,
+    retries=3,
+):
+    """
+    Looks up legislators for many latitude/longitude coordinates
+
+    Points are rounded to ``precision`` decimal places (4 places is roughly
+    10 meters) and only one request is made per distinct rounded point.
+    Requests are made concurrently, but never faster than
+    ``requests_per_second``.
+
+    Args:
+        points: An iterable of ``(lat, lng)`` pairs
+        precision: Number of decimal places to round coordinates to
+        fields: An optional custom list of fields to return
+        max_workers: Maximum number of concurrent requests
+        requests_per_second: Maximum request rate, or None for no limit
+        cache: An optional dictionary mapping rounded ``(lat, lng)`` pairs to
+            results, which is consulted and updated so that results can be
+            reused across calls
+        retries: Number of times to retry transient errors for each point
+
+    Yields:
+        ``(point, legislators)`` tuples, in the order lookups complete
+    """
+    if cache is None:
+        cache = {}
+    cells = {}
+    for point in points:
+        lat, lng = point
+        cell = (round(float(lat), precision), round(float(lng), precision))
+        cells.setdefault(cell, []).append(point)
+
+    for cell in [c for c in cells if c in cache]:
+        for point in cells.pop(cell):
+            yield point, cache[cell]
+
+    def _locate(cell):
+        return locate_legislators(*cell, fields=fields, retries=retries)
+
+    results = _bounded_map(
+        _locate,
+        list(cells),
+        max_workers=max_workers,
+        requests_per_second=requests_per_second,
+        ordered=False,
+    )
+    with contextlib.closing(results):
+        for cell, legislators in results:
+            cache[cell] = legislators
+            for point in cells[cell]:
+                yield point, legislators
+
+
 def search_districts(state, chamber):
     """
     Search for districts
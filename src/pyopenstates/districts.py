@@ -0,0 +1,213 @@
+import json
+import pathlib
+from typing import Iterable, Optional, Union
+
+from .core import get_organizations
+
+CHAMBERS = ("upper", "lower")
+
+
+class DistrictIndex:
+    """
+    An offline index of legislative districts, built from jurisdiction
+    organization metadata and (optionally) district boundary files.
+
+    Once built, `search_districts` and `locate` run entirely in memory with no
+    API calls.  Point lookups are backed by a `shapely.STRtree` over the
+    district shapes and are vectorized over arrays of coordinates, so
+    resolving large batches of addresses is cheap.
+
+    Spatial lookups require the optional `shapely` (>= 2.0) dependency.
+    """
+
+    def __init__(self, districts: Optional[Iterable[dict]] = None):
+        self.districts = []
+        self._by_chamber = {}
+        self._by_division = {}
+        self._geometries = {}
+        self._tree = None
+        self._tree_ids = []
+        for district in districts or []:
+            self.add_district(district)
+
+    def __len__(self):
+        return len(self.districts)
+
+    def add_district(self, district: dict):
+        """
+        Adds a single district dictionary to the index.
+
+        The dictionary should contain `jurisdiction`, `chamber`, `label`, and
+        `division_id` keys, as produced by `add_organizations`.
+        """
+        self.districts.append(district)
+        key = (district["jurisdiction"], district["chamber"])
+        self._by_chamber.setdefault(key, []).append(district)
+        if district.get("division_id"):
+            self._by_division[district["division_id"]] = district
+
+    def add_organizations(self, state: str, organizations: Optional[list] = None):
+        """
+        Adds the districts of each legislative chamber for the given state.
+
+        Args:
+            state: The postal code of the state
+            organizations: The state's organizations, as returned by
+                `get_organizations`; fetched from the API if not given.
+        """
+        if organizations is None:
+            organizations = get_organizations(state)
+        for org in organizations:
+            if org.get("classification") not in CHAMBERS:
+                continue
+            for district in org.get("districts") or []:
+                self.add_district(
+                    dict(
+                        district,
+                        jurisdiction=state.lower(),
+                        chamber=org["classification"],
+                    )
+                )
+
+    def add_boundaries(
+        self,
+        geojson: Union[str, pathlib.Path, dict],
+        id_property: str = "division_id",
+    ):
+        """
+        Adds district shapes from a GeoJSON `FeatureCollection`.
+
+        Args:
+            geojson: A path to a GeoJSON file, or an already-parsed dictionary
+            id_property: The feature property holding the district's OCD
+                division ID, used to match shapes to indexed districts
+
+        Features whose ID does not match an indexed district are ignored.
+        """
+        import shapely.geometry
+
+        if not isinstance(geojson, dict):
+            with open(geojson) as f:
+                geojson = json.load(f)
+        for feature in geojson["features"]:
+            division_id = feature["properties"].get(id_property)
+            if division_id in self._by_division:
+                self._geometries[division_id] = shapely.geometry.shape(
+                    feature["geometry"]
+                )
+        self._tree = None
+
+    def search_districts(self, state: str, chamber: str):
+        """
+        Offline equivalent of `pyopenstates.search_districts`.
+
+        Returns:
+            A list of matching district dictionaries
+        """
+        chamber = chamber.lower()
+        if chamber not in CHAMBERS:
+            raise ValueError('Chamber must be "upper" or "lower"')
+        return list(self._by_chamber.get((state.lower(), chamber), []))
+
+    def get_district(self, division_id: str):
+        """Returns the district with the given OCD division ID, or None"""
+        return self._by_division.get(division_id)
+
+    def _build_tree(self):
+        import shapely
+
+        self._tree_ids = list(self._geometries)
+        self._tree = shapely.STRtree([self._geometries[d] for d in self._tree_ids])
+
+    def locate(self, lat, lng):
+        """
+        Finds the districts containing each of the given coordinates.
+
+        Args:
+            lat: A latitude, or an array-like of latitudes
+            lng: A longitude, or an array-like of longitudes
+
+        Returns:
+            A list with one entry per coordinate, each a list of the district
+            dictionaries containing that point.  Overlapping districts (such
+            as floterial districts) are all returned, but a point lying only
+            on the boundary between districts of a chamber is assigned to just
+            one of them, whichever shape was added to the index first.
+        """
+        import numpy as np
+        import shapely
+
+        if self._tree is None:
+            self._build_tree()
+        lat = np.atleast_1d(np.asarray(lat, dtype=float))
+        lng = np.atleast_1d(np.asarray(lng, dtype=float))
+        if lat.shape != lng.shape:
+            raise ValueError("lat and lng must have the same shape")
+
+        matches = [[] for _ in range(len(lat))]
+        if not self._tree_ids:
+            return matches
+        points = shapely.points(lng, lat)
+        point_idx, tree_idx = self._tree.query(points, predicate="intersects")
+        order = np.lexsort((tree_idx, point_idx))
+        point_idx, tree_idx = point_idx[order], tree_idx[order]
+        interior = shapely.within(points[point_idx], self._tree.geometries[tree_idx])
+
+        boundary_seen = set()
+        for p, t, inside in zip(point_idx, tree_idx, interior):
+            district = self._by_division[self._tree_ids[t]]
+            if not inside:
+                if (p, district["chamber"]) in boundary_seen:
+                    continue
+                boundary_seen.add((p, district["chamber"]))
+            matches[p].append(district)
+        return matches
+
+    def save(self, path: Union[str, pathlib.Path]):
+        """Writes the index (including shapes) to a JSON file"""
+        geometries = {}
+        if self._geometries:
+            import shapely
+
+            geometries = {
+                d: shapely.to_wkb(g, hex=True) for d, g in self._geometries.items()
+            }
+        with open(path, "w") as f:
+            json.dump({"districts": self.districts, "geometries": geometries}, f)
+
+    @classmethod
+    def load(cls, path: Union[str, pathlib.Path]) -> "DistrictIndex":
+        """Reads an index previously written with `save`"""
+        with open(path) as f:
+            data = json.load(f)
+        index = cls(data["districts"])
+        if data["geometries"]:
+            import shapely
+
+            index._geometries = {
+                d: shapely.from_wkb(g) for d, g in data["geometries"].items()
+            }
+        return index
+
+
+def build_district_index(
+    states: Iterable[str], boundaries: Iterable = (), id_property: str = "division_id"
+) -> DistrictIndex:
+    """
+    Builds a `DistrictIndex` for the given states.
+
+    Args:
+        states: Postal codes of the states to index
+        boundaries: GeoJSON files (or dictionaries) of district shapes
+        id_property: The feature property holding each district's OCD
+            division ID
+
+    Returns:
+        A populated `DistrictIndex`
+    """
+    index = DistrictIndex()
+    for state in states:
+        index.add_organizations(state)
+    for geojson in boundaries:
+        index.add_boundaries(geojson, id_property=id_property)
+    return index
@@ -1,12 +1,13 @@
+import contextlib
 import csv
 import io
+import json
 import pathlib
-import requests
 import tempfile
 import zipfile
+from array import array
 from enum import Enum
-
-from .core import get_metadata
+from typing import Tuple
 
 TEMP_PATH = pathlib.Path(tempfile.gettempdir()) / "OS_ZIP_CACHE"
 
@@ -43,6 +44,8 @@ class FileType(Enum):
 
 
 def _get_download_url(jurisdiction: str, session: str) -> str:
+    from .core import get_metadata
+
     sessions = get_metadata(jurisdiction, include="legislative_sessions")[
         "legislative_sessions"
     ]
@@ -54,33 +57,67 @@ def _get_download_url(jurisdiction: str, session: str) -> str:
     return ses["downloads"][0]["url"]
 
 
+def _zip_path(url: str) -> pathlib.Path:
+    return TEMP_PATH / url.split("/")[-1]
+
+
 def _download_zip(url: str) -> pathlib.Path:
-    filename = url.split("/")[-1]
-    local_path = TEMP_PATH / filename
+    local_path = _zip_path(url)
     TEMP_PATH.mkdir(parents=True, exist_ok=True)
     if not local_path.exists():
+        import requests
+
         with open(local_path, "wb") as f:
             f.write(requests.get(url).content)
     return local_path
 
 
+# functions called with (state, session, url, zip_path) whenever a session's
+# bulk data is newly downloaded, e.g. to keep a search index up to date
+_download_hooks = []
+
+
+def _session_zip(state: str, session: str) -> Tuple[str, pathlib.Path]:
+    """Returns the URL and local path of a session's bulk data zip"""
+    url = _get_download_url(state, session)
+    downloaded = not _zip_path(url).exists()
+    zip_path = _download_zip(url)
+    if downloaded:
+        for hook in list(_download_hooks):
+            hook(state, session, url, zip_path)
+    return url, zip_path
+
+
 def _load_session_data(state: str, session: str, file_type: FileType) -> str:
     if file_type == FileType.People:
+        import requests
+
         return requests.get(
             f"https://data.openstates.org/people/current/{state}.csv"
         ).text
-    url = _get_download_url(state, session)
-    zip_path = _download_zip(url)
+    _, zip_path = _session_zip(state, session)
     with zipfile.ZipFile(zip_path) as zf:
-        for filename in zf.namelist():
-            if filename.endswith(file_type.value):
-                break
-        else:
-            raise ValueError(f"no file of type {file_type} in {zip_path}")
-        with zf.open(filename) as df:
+        with zf.open(_zip_member(zf, file_type)) as df:
             return df.read().decode()
 
 
+def _zip_member(zf: zipfile.ZipFile, file_type: FileType) -> str:
+    for filename in zf.namelist():
+        if filename.endswith(file_type.value):
+            return filename
+    raise ValueError(f"no file of type {file_type} in {zf.filename}")
+
+
+@contextlib.contextmanager
+def _open_zip_csv(zf: zipfile.ZipFile, file_type: FileType):
+    """
+    Yields a `csv.DictReader` streaming the requested file from an open
+    session bulk data zip, without decoding the whole file into memory.
+    """
+    with zf.open(_zip_member(zf, file_type)) as df:
+        yield csv.DictReader(io.TextIOWrapper(df, encoding="utf-8", newline=""))
+
+
 def load_csv(state: str, session: str, file_type: FileType):
     """
     Returns an instantiated `csv.DictReader` to iterate over the requested file.
@@ -151,3 +188,108 @@ def load_merged_dataframe(state: str, session: str, which: FileType):
         )
     else:
         return other_df
+
+
+# int8 codes used for each vote option in a `VoteMatrix`, 0 meaning no record
+VOTE_OPTION_CODES = {
+    "yes": 1,
+    "no": -1,
+    "abstain": 2,
+    "not voting": 3,
+    "absent": 4,
+    "excused": 5,
+    "paired": 6,
+    "other": 7,
+}
+
+
+class VoteMatrix:
+    """
+    A legislator × vote event matrix of `VOTE_OPTION_CODES`, as built by
+    `load_vote_matrix`.
+
+    - `matrix`: `numpy.ndarray` (or memory-mapped array) of `int8` codes
+    - `people`: the voter for each row, the `voter_id` if matched to a person
+      or the `voter_name` otherwise
+    - `votes`: the `vote_event_id` for each column
+    """
+
+    def __init__(self, matrix, people: list, votes: list):
+        self.matrix = matrix
+        self.people = people
+        self.votes = votes
+        self.person_index = {p: i for i, p in enumerate(people)}
+        self.vote_index = {v: i for i, v in enumerate(votes)}
+
+    def agreement(self):
+        """
+        Returns a people × people array of the fraction of votes on which each
+        pair of legislators both voted yes or both voted no, out of the votes
+        on which both voted yes or no.  Pairs with no such votes are `nan`.
+        """
+        import numpy as np
+
+        yes = (self.matrix == VOTE_OPTION_CODES["yes"]).astype(np.float32)
+        no = (self.matrix == VOTE_OPTION_CODES["no"]).astype(np.float32)
+        voted = yes + no
+        agreed = yes @ yes.T + no @ no.T
+        shared = voted @ voted.T
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(shared > 0, agreed / shared, np.nan)
+
+    @classmethod
+    def load(cls, path: pathlib.Path) -> "VoteMatrix":
+        """Memory-maps a matrix previously written by `load_vote_matrix`"""
+        import numpy as np
+
+        path = pathlib.Path(path)
+        with open(path.with_suffix(".json")) as f:
+            index = json.load(f)
+        return cls(np.load(path, mmap_mode="r"), index["people"], index["votes"])
+
+
+def load_vote_matrix(state: str, session: str, path=None) -> VoteMatrix:
+    """
+    Returns a `VoteMatrix` of how each legislator voted on each vote event,
+    built by streaming the `FileType.Votes` and `FileType.VotePeople` files.
+
+    If `path` is given, the matrix is written to that `.npy` file as a
+    memory-mapped array (with its index maps alongside in a `.json` file),
+    and can be reopened later with `VoteMatrix.load`.
+
+    Requires `numpy`.
+    """
+    import numpy as np
+
+    _, zip_path = _session_zip(state, session)
+    person_index = {}
+    person_idx, vote_idx, codes = array("q"), array("q"), array("b")
+    other = VOTE_OPTION_CODES["other"]
+    with zipfile.ZipFile(zip_path) as zf:
+        with _open_zip_csv(zf, FileType.Votes) as rows:
+            vote_index = {row["id"]: i for i, row in enumerate(rows)}
+        # a single pass over the votes, keeping compact (person, vote, option)
+        # triples to scatter into the matrix once its shape is known
+        with _open_zip_csv(zf, FileType.VotePeople) as rows:
+            for row in rows:
+                voter = row["voter_id"] or row["voter_name"]
+                person_idx.append(person_index.setdefault(voter, len(person_index)))
+                vote_idx.append(vote_index[row["vote_event_id"]])
+                codes.append(VOTE_OPTION_CODES.get(row["option"], other))
+
+    people, votes = list(person_index), list(vote_index)
+    shape = (len(people), len(votes))
+    if path:
+        path = pathlib.Path(path)
+        matrix = np.lib.format.open_memmap(path, mode="w+", dtype=np.int8, shape=shape)
+        with open(path.with_suffix(".json"), "w") as f:
+            json.dump({"people": people, "votes": votes}, f)
+    else:
+        matrix = np.zeros(shape, dtype=np.int8)
+    matrix[
+        np.frombuffer(person_idx, dtype=np.int64),
+        np.frombuffer(vote_idx, dtype=np.int64),
+    ] = np.frombuffer(codes, dtype=np.int8)
+    if path:
+        matrix.flush()
+    return VoteMatrix(matrix, people, votes)
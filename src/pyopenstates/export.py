@@ -0,0 +1,300 @@
+import csv
+import json
+import pathlib
+from datetime import date
+from typing import Iterable, Union
+
+from .core import _json_default
+from .downloads import FileType
+
+# columns of the bulk data CSV files, which exported API results share
+BULK_COLUMNS = {
+    FileType.Bills: (
+        "id",
+        "identifier",
+        "title",
+        "classification",
+        "subject",
+        "session_identifier",
+        "jurisdiction",
+        "organization_classification",
+        "created_at",
+        "updated_at",
+    ),
+    FileType.Actions: (
+        "id",
+        "bill_id",
+        "organization_id",
+        "description",
+        "date",
+        "classification",
+        "order",
+    ),
+    FileType.Sponsorships: (
+        "id",
+        "bill_id",
+        "name",
+        "entity_type",
+        "organization_id",
+        "person_id",
+        "primary",
+        "classification",
+    ),
+    FileType.People: (
+        "id",
+        "name",
+        "current_party",
+        "current_district",
+        "current_chamber",
+        "given_name",
+        "family_name",
+        "gender",
+        "email",
+        "birth_date",
+        "death_date",
+        "image",
+    ),
+}
+
+FORMATS = ("csv", "parquet", "ndjson")
+
+
+def _value(obj):
+    if isinstance(obj, date):
+        return obj.isoformat()
+    elif obj is None:
+        return ""
+    return obj
+
+
+def _id(obj):
+    return (obj or {}).get("id")
+
+
+def flatten_bill(bill: dict):
+    """
+    Flattens a bill from the API into rows matching the bulk data files.
+
+    Returns:
+        A dictionary mapping `FileType.Bills`, `FileType.Actions`, and
+        `FileType.Sponsorships` to lists of rows.  Actions and sponsorships
+        are only populated if they were requested with ``include``.
+    """
+    bill_row = dict(
+        id=bill["id"],
+        identifier=bill.get("identifier"),
+        title=bill.get("title"),
+        classification=bill.get("classification"),
+        subject=bill.get("subject"),
+        session_identifier=bill.get("session"),
+        jurisdiction=(bill.get("jurisdiction") or {}).get("name"),
+        organization_classification=(bill.get("from_organization") or {}).get(
+            "classification"
+        ),
+        created_at=bill.get("created_at"),
+        updated_at=bill.get("updated_at"),
+    )
+    actions = [
+        dict(
+            id=action.get("id"),
+            bill_id=bill["id"],
+            organization_id=_id(action.get("organization")),
+            description=action.get("description"),
+            date=action.get("date"),
+            classification=action.get("classification"),
+            order=action.get("order"),
+        )
+        for action in bill.get("actions") or []
+    ]
+    sponsorships = [
+        dict(
+            id=sponsorship.get("id"),
+            bill_id=bill["id"],
+            name=sponsorship.get("name"),
+            entity_type=sponsorship.get("entity_type"),
+            organization_id=_id(sponsorship.get("organization")),
+            person_id=_id(sponsorship.get("person")),
+            primary=sponsorship.get("primary"),
+            classification=sponsorship.get("classification"),
+        )
+        for sponsorship in bill.get("sponsorships") or []
+    ]
+    return {
+        FileType.Bills: [bill_row],
+        FileType.Actions: actions,
+        FileType.Sponsorships: sponsorships,
+    }
+
+
+def flatten_legislator(person: dict):
+    """
+    Flattens a legislator from the API into a row matching the bulk people
+    files.
+    """
+    role = person.get("current_role") or {}
+    return dict(
+        id=person["id"],
+        name=person.get("name"),
+        current_party=person.get("party"),
+        current_district=role.get("district"),
+        current_chamber=role.get("org_classification"),
+        given_name=person.get("given_name"),
+        family_name=person.get("family_name"),
+        gender=person.get("gender"),
+        email=person.get("email"),
+        birth_date=person.get("birth_date"),
+        death_date=person.get("death_date"),
+        image=person.get("image"),
+    )
+
+
+class _CSVTable:
+    def __init__(self, path, columns):
+        self.file = open(path, "w", newline="", encoding="utf-8")
+        self.writer = csv.DictWriter(self.file, columns)
+        self.writer.writeheader()
+
+    def write(self, rows):
+        self.writer.writerows({k: _value(v) for k, v in row.items()} for row in rows)
+
+    def close(self):
+        self.file.close()
+
+
+class _ParquetTable:
+    def __init__(self, path, columns):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.pa = pa
+        self.columns = columns
+        self.schema = pa.schema([(c, pa.string()) for c in columns])
+        self.writer = pq.ParquetWriter(path, self.schema)
+
+    def write(self, rows):
+        if not rows:
+            return
+        # stored as strings, matching the values of the bulk CSV files
+        data = {
+            c: [None if row[c] is None else str(_value(row[c])) for row in rows]
+            for c in self.columns
+        }
+        self.writer.write_table(self.pa.table(data, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+def _file_path(directory, name, file_type, format):
+    # bulk files are named like "AL_2021s1_bill_actions.csv"
+    if file_type == FileType.People:
+        suffix = "_people"
+    else:
+        suffix = file_type.value[: -len(".csv")]
+    return pathlib.Path(directory) / f"{name}{suffix}.{format}"
+
+
+def _export(records, flatten, file_types, directory, name, format, batch_size):
+    if format not in FORMATS:
+        raise ValueError(f"format must be one of {FORMATS}")
+    pathlib.Path(directory).mkdir(parents=True, exist_ok=True)
+    if format == "ndjson":
+        path = _file_path(directory, name, file_types[0], format)
+        write_ndjson(records, path)
+        return {file_types[0]: path}
+
+    table_class = {"csv": _CSVTable, "parquet": _ParquetTable}[format]
+    paths = {ft: _file_path(directory, name, ft, format) for ft in file_types}
+    tables = {ft: table_class(paths[ft], BULK_COLUMNS[ft]) for ft in file_types}
+    batches = {ft: [] for ft in file_types}
+    try:
+        for record in records:
+            for ft, rows in flatten(record).items():
+                batches[ft] += rows
+                if len(batches[ft]) >= batch_size:
+                    tables[ft].write(batches[ft])
+                    batches[ft] = []
+        for ft, rows in batches.items():
+            tables[ft].write(rows)
+    finally:
+        for table in tables.values():
+            table.close()
+    return paths
+
+
+def write_ndjson(records: Iterable[dict], path: Union[str, pathlib.Path]) -> int:
+    """
+    Writes API results to a newline-delimited JSON file, one record per line.
+
+    Returns:
+        The number of records written
+    """
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, default=_json_default) + "\n")
+            count += 1
+    return count
+
+
+def export_bills(
+    bills: Iterable[dict],
+    directory: Union[str, pathlib.Path],
+    name: str = "export",
+    format: str = "csv",
+    batch_size: int = 1000,
+) -> dict:
+    """
+    Incrementally writes bills from the API to files sharing the bulk data
+    schema, e.g. ``export_bills(iter_bills(state="nc", include=["actions",
+    "sponsorships"]), "out/")``.
+
+    With ``format="csv"`` or ``"parquet"`` the bills are flattened into
+    `FileType.Bills`, `FileType.Actions` and `FileType.Sponsorships` tables
+    named like the bulk files (e.g. ``export_bill_actions.csv``).  With
+    ``format="ndjson"`` the nested bills are written as-is to
+    ``export_bills.ndjson``.  Parquet output requires `pyarrow`.
+
+    Args:
+        bills: An iterable of bills, such as `pyopenstates.iter_bills`
+        directory: Directory to write files to
+        name: Prefix for the file names
+        format: One of ``"csv"``, ``"parquet"``, or ``"ndjson"``
+        batch_size: Number of rows to buffer per table before writing
+
+    Returns:
+        A dictionary mapping each `FileType` to the path it was written to
+    """
+    return _export(
+        bills,
+        flatten_bill,
+        (FileType.Bills, FileType.Actions, FileType.Sponsorships),
+        directory,
+        name,
+        format,
+        batch_size,
+    )
+
+
+def export_legislators(
+    legislators: Iterable[dict],
+    directory: Union[str, pathlib.Path],
+    name: str = "export",
+    format: str = "csv",
+    batch_size: int = 1000,
+) -> dict:
+    """
+    Incrementally writes legislators from the API to a file sharing the
+    schema of the bulk people files (e.g. ``export_people.csv``).
+
+    Takes the same arguments as `export_bills`.
+    """
+    return _export(
+        legislators,
+        lambda person: {FileType.People: [flatten_legislator(person)]},
+        (FileType.People,),
+        directory,
+        name,
+        format,
+        batch_size,
+    )
@@ -0,0 +1,256 @@
+import pathlib
+import sqlite3
+import threading
+import zipfile
+from typing import Optional, Union
+
+from . import downloads
+from .downloads import FileType
+
+DEFAULT_INDEX_PATH = downloads.TEMP_PATH / "search.sqlite"
+
+# relative weights of the indexed columns when ranking results
+_WEIGHTS = {"identifier": 10.0, "title": 5.0, "subject": 2.0, "actions": 1.0}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    state TEXT NOT NULL,
+    session TEXT NOT NULL,
+    url TEXT,
+    PRIMARY KEY (state, session)
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS bills USING fts5(
+    bill_id UNINDEXED,
+    state UNINDEXED,
+    session UNINDEXED,
+    identifier,
+    title,
+    subject,
+    actions,
+    versions,
+    tokenize = 'porter unicode61'
+);
+"""
+
+
+def _match_expression(q: str) -> str:
+    # quote each term so user input can't be parsed as FTS5 query syntax
+    return " ".join('"{}"'.format(term.replace('"', '""')) for term in q.split())
+
+
+class LocalSearchIndex:
+    """
+    An offline full-text index of bills, built from a session's bulk data
+    files and stored in a SQLite FTS5 database.
+
+    Bill identifiers, titles, subjects, action descriptions and version notes
+    are indexed.
+
+    An index can be shared between threads; each thread gets its own
+    connection to the database.
+
+    With `update_on_download`, indexed sessions are re-indexed whenever newer
+    bulk data for them is downloaded (e.g. by `pyopenstates.downloads.load_csv`).
+    """
+
+    def __init__(
+        self,
+        path: Union[str, pathlib.Path] = DEFAULT_INDEX_PATH,
+        update_on_download: bool = False,
+    ):
+        self.path = pathlib.Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        self.db.executescript(_SCHEMA)
+        if update_on_download:
+            downloads._download_hooks.append(self._on_download)
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        """The calling thread's connection to the index database"""
+        db = getattr(self._local, "db", None)
+        if db is None:
+            # only ever used by this thread, but close() may run elsewhere
+            db = sqlite3.connect(str(self.path), check_same_thread=False)
+            self._local.db = db
+            with self._lock:
+                self._connections.append(db)
+        return db
+
+    def close(self):
+        """Closes the connections of every thread"""
+        if self._on_download in downloads._download_hooks:
+            downloads._download_hooks.remove(self._on_download)
+        with self._lock:
+            for db in self._connections:
+                db.close()
+            self._connections = []
+        self._local = threading.local()
+
+    def sessions(self):
+        """Returns a list of the `(state, session)` pairs in the index"""
+        return self.db.execute(
+            "SELECT state, session FROM sessions ORDER BY state, session"
+        ).fetchall()
+
+    def _indexed_url(self, state, session):
+        row = self.db.execute(
+            "SELECT url FROM sessions WHERE state = ? AND session = ?",
+            (state, session),
+        ).fetchone()
+        return row[0] if row else None
+
+    def add_session(self, state: str, session: str, replace: bool = False) -> bool:
+        """
+        Indexes the bills of a session, downloading its bulk data if needed.
+
+        An already indexed session is left as it is, without any API
+        requests, unless `replace` is set, in which case it is re-indexed
+        from the latest bulk data.
+
+        Returns:
+            True if the session was (re-)indexed
+        """
+        state = state.lower()
+        indexed_url = self._indexed_url(state, session)
+        if indexed_url and not replace:
+            return False
+        url, zip_path = downloads._session_zip(state, session)
+        if self._indexed_url(state, session) != indexed_url:
+            # already re-indexed by _on_download when the new zip arrived
+            return True
+        self._index_zip(state, session, url, zip_path)
+        return True
+
+    def _on_download(self, state, session, url, zip_path):
+        state = state.lower()
+        indexed_url = self._indexed_url(state, session)
+        if indexed_url and indexed_url != url:
+            self._index_zip(state, session, url, zip_path)
+
+    def _index_zip(self, state, session, url, zip_path):
+        with zipfile.ZipFile(zip_path) as zf:
+            actions = {}
+            with downloads._open_zip_csv(zf, FileType.Actions) as rows:
+                for action in rows:
+                    actions.setdefault(action["bill_id"], []).append(
+                        action["description"]
+                    )
+            versions = {}
+            with downloads._open_zip_csv(zf, FileType.Versions) as rows:
+                for version in rows:
+                    versions.setdefault(version["bill_id"], []).append(version["note"])
+            with downloads._open_zip_csv(zf, FileType.Bills) as bills:
+                self._replace_bills(state, session, url, bills, actions, versions)
+
+    def _replace_bills(self, state, session, url, bills, actions, versions):
+        db = self.db
+        with db:
+            db.execute(
+                "DELETE FROM bills WHERE state = ? AND session = ?", (state, session)
+            )
+            db.executemany(
+                "INSERT INTO bills VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    (
+                        bill["id"],
+                        state,
+                        session,
+                        bill["identifier"],
+                        bill["title"],
+                        bill["subject"],
+                        "\n".join(actions.get(bill["id"], [])),
+                        "\n".join(versions.get(bill["id"], [])),
+                    )
+                    for bill in bills
+                ),
+            )
+            db.execute(
+                "INSERT OR REPLACE INTO sessions VALUES (?, ?, ?)",
+                (state, session, url),
+            )
+
+    def search(
+        self,
+        q: str,
+        state: Optional[str] = None,
+        session: Optional[str] = None,
+        limit: int = 20,
+    ):
+        """
+        Searches indexed bills, best matches first.
+
+        Args:
+            q: Search terms; bills must match all of them
+            state: Optionally restrict results to one state
+            session: Optionally restrict results to one session
+            limit: Maximum number of results
+
+        Returns:
+            A list of dictionaries with `id`, `state`, `session`, `identifier`,
+            `title` and `score` keys
+        """
+        if not q.strip():
+            return []
+        weights = ", ".join(["0, 0, 0"] + [str(w) for w in _WEIGHTS.values()] + ["1"])
+        sql = (
+            f"SELECT bill_id, state, session, identifier, title, bm25(bills, {weights})"
+            " AS score FROM bills WHERE bills MATCH ?"
+        )
+        params = [_match_expression(q)]
+        if state:
+            sql += " AND state = ?"
+            params.append(state.lower())
+        if session:
+            sql += " AND session = ?"
+            params.append(session)
+        sql += " ORDER BY score LIMIT ?"
+        params.append(limit)
+        return [
+            dict(
+                id=row[0],
+                state=row[1],
+                session=row[2],
+                identifier=row[3],
+                title=row[4],
+                # bm25 scores are lower for better matches
+                score=-row[5],
+            )
+            for row in self.db.execute(sql, params)
+        ]
+
+
+_default_index = None
+_default_index_lock = threading.Lock()
+
+
+def _get_default_index():
+    global _default_index
+    with _default_index_lock:
+        if _default_index is None:
+            _default_index = LocalSearchIndex(update_on_download=True)
+    return _default_index
+
+
+def index_session(state: str, session: str, replace: bool = False) -> bool:
+    """
+    Adds a session's bills to the default local search index.
+
+    The default index is kept up to date as newer bulk data for its sessions
+    is downloaded.  See `LocalSearchIndex.add_session`.
+    """
+    return _get_default_index().add_session(state, session, replace=replace)
+
+
+def search_local(
+    q: str, state: Optional[str] = None, session: Optional[str] = None, limit=20
+):
+    """
+    Searches bills in the default local search index, without using the API.
+
+    Sessions must first be added with `index_session`.  See
+    `LocalSearchIndex.search`.
+    """
+    return _get_default_index().search(q, state=state, session=session, limit=limit)
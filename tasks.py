@@ -44,3 +44,8 @@ def release(c, old, new):
     c.run("poetry publish --build", pty=True)
     c.run("poetry run mkdocs gh-deploy", pty=True)
     c.run(f"gh release create v{new} -F docs/changelog.md")
+
+
+@task
+def importtime(c):
+    c.run('poetry run python -X importtime -c "import pyopenstates"', pty=True)
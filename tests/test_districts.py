@@ -0,0 +1,110 @@
+import pytest
+from pyopenstates.districts import DistrictIndex
+
+ORGANIZATIONS = [
+    {"classification": "legislature", "districts": []},
+    {
+        "classification": "upper",
+        "districts": [
+            {"label": "1", "division_id": "ocd-division/country:us/state:xx/sldu:1"},
+        ],
+    },
+    {
+        "classification": "lower",
+        "districts": [
+            {"label": "1", "division_id": "ocd-division/country:us/state:xx/sldl:1"},
+            {"label": "2", "division_id": "ocd-division/country:us/state:xx/sldl:2"},
+        ],
+    },
+]
+
+
+def _square(division_id, x0, y0, x1, y1):
+    return {
+        "type": "Feature",
+        "properties": {"division_id": division_id},
+        "geometry": {
+            "type": "Polygon",
+            "coordinates": [[[x0, y0], [x1, y0], [x1, y1], [x0, y1], [x0, y0]]],
+        },
+    }
+
+
+BOUNDARIES = {
+    "type": "FeatureCollection",
+    "features": [
+        _square("ocd-division/country:us/state:xx/sldu:1", 0, 0, 2, 1),
+        _square("ocd-division/country:us/state:xx/sldl:1", 0, 0, 1, 1),
+        _square("ocd-division/country:us/state:xx/sldl:2", 1, 0, 2, 1),
+    ],
+}
+
+
+@pytest.fixture
+def index():
+    index = DistrictIndex()
+    index.add_organizations("XX", ORGANIZATIONS)
+    return index
+
+
+def test_search_districts(index):
+    assert len(index) == 3
+    assert [d["label"] for d in index.search_districts("xx", "LOWER")] == ["1", "2"]
+    assert index.search_districts("yy", "upper") == []
+    with pytest.raises(ValueError):
+        index.search_districts("xx", "joint")
+
+    index.search_districts("xx", "lower").clear()
+    assert len(index.search_districts("xx", "lower")) == 2
+
+
+def test_locate(index):
+    pytest.importorskip("shapely")
+    index.add_boundaries(BOUNDARIES)
+    results = index.locate([0.5, 0.5, 5.0], [0.5, 1.5, 5.0])
+    assert len(results) == 3
+    assert sorted(d["chamber"] + d["label"] for d in results[0]) == ["lower1", "upper1"]
+    assert sorted(d["chamber"] + d["label"] for d in results[1]) == ["lower2", "upper1"]
+    assert results[2] == []
+
+    # a point on the edge between two lower districts gets only one of them
+    (edge,) = index.locate(0.5, 1.0)
+    assert sorted(d["chamber"] + d["label"] for d in edge) == ["lower1", "upper1"]
+
+
+def test_locate_overlapping(index):
+    pytest.importorskip("shapely")
+    floterial = "ocd-division/country:us/state:xx/sldl:f1"
+    index.add_district(
+        {
+            "jurisdiction": "xx",
+            "chamber": "lower",
+            "label": "F1",
+            "division_id": floterial,
+        }
+    )
+    index.add_boundaries(
+        {"features": BOUNDARIES["features"] + [_square(floterial, 0, 0, 2, 1)]}
+    )
+    # overlapping districts of the same chamber are all returned
+    (inside,) = index.locate(0.5, 0.5)
+    assert sorted(d["label"] for d in inside if d["chamber"] == "lower") == ["1", "F1"]
+    (edge,) = index.locate(0.5, 1.0)
+    assert sorted(d["label"] for d in edge if d["chamber"] == "lower") == ["1", "F1"]
+
+
+def test_save_load(index, tmp_path):
+    pytest.importorskip("shapely")
+    index.add_boundaries(BOUNDARIES)
+    index.save(tmp_path / "index.json")
+    loaded = DistrictIndex.load(tmp_path / "index.json")
+    assert len(loaded) == 3
+    assert sorted(d["label"] for d in loaded.locate(0.5, 1.5)[0]) == ["1", "2"]
+
+
+def test_save_load_without_boundaries(index, tmp_path):
+    index.save(tmp_path / "index.json")
+    loaded = DistrictIndex.load(tmp_path / "index.json")
+    assert loaded.search_districts("xx", "lower") == index.search_districts(
+        "xx", "lower"
+    )
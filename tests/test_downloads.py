@@ -1,7 +1,13 @@
+import zipfile
+
+import pytest
+from pyopenstates import downloads
 from pyopenstates.downloads import (
     load_csv,
     FileType,
     load_merged_dataframe,
+    load_vote_matrix,
+    VoteMatrix,
 )
 
 
@@ -62,3 +68,48 @@ def test_load_merged_dataframe_votes_joins():
     vs_df = load_merged_dataframe("al", "2021s1", FileType.VoteCounts)
     assert len(vs_df) == 33 * 3
     assert "option" in list(vs_df.columns)
+
+
+def test_load_vote_matrix():
+    np = pytest.importorskip("numpy")
+    vm = load_vote_matrix("al", "2021s1")
+    assert vm.matrix.shape == (len(vm.people), 33)
+    assert np.count_nonzero(vm.matrix) == 1494
+
+
+def test_vote_matrix_memmap(monkeypatch, tmp_path):
+    np = pytest.importorskip("numpy")
+    files = {
+        "xx_2021_votes.csv": "id,motion_text\nv1,pass\nv2,amend\nv3,adjourn\n",
+        "xx_2021_vote_people.csv": (
+            "id,vote_event_id,option,voter_name,voter_id\n"
+            "1,v1,yes,Smith,ocd-person/1\n"
+            "2,v1,yes,Jones,\n"
+            "3,v2,no,Smith,ocd-person/1\n"
+            "4,v2,yes,Jones,\n"
+            "5,v3,excused,Jones,\n"
+        ),
+    }
+    zip_path = tmp_path / "xx_2021.zip"
+    with zipfile.ZipFile(zip_path, "w") as zf:
+        for filename, data in files.items():
+            zf.writestr(filename, data)
+    urls = []
+    monkeypatch.setattr(
+        downloads,
+        "_get_download_url",
+        lambda state, session: urls.append(session) or "https://example.com/xx.zip",
+    )
+    monkeypatch.setattr(downloads, "_download_zip", lambda url: zip_path)
+
+    vm = load_vote_matrix("xx", "2021", path=tmp_path / "votes.npy")
+    assert urls == ["2021"]
+    assert vm.people == ["ocd-person/1", "Jones"]
+    assert vm.votes == ["v1", "v2", "v3"]
+    assert vm.matrix.tolist() == [[1, -1, 0], [1, 1, 5]]
+    assert vm.agreement()[0, 1] == 0.5
+
+    loaded = VoteMatrix.load(tmp_path / "votes.npy")
+    assert isinstance(loaded.matrix, np.memmap)
+    assert loaded.matrix.tolist() == vm.matrix.tolist()
+    assert loaded.vote_index["v3"] == 2
@@ -0,0 +1,92 @@
+import csv
+import json
+from datetime import datetime
+
+import pytest
+from pyopenstates.downloads import FileType
+from pyopenstates.export import export_bills, export_legislators
+
+BILLS = [
+    {
+        "id": "ocd-bill/1",
+        "session": "2021",
+        "jurisdiction": {"id": "ocd-jurisdiction/x", "name": "Alabama"},
+        "from_organization": {"classification": "lower"},
+        "identifier": "HB 1",
+        "title": "An act",
+        "classification": ["bill"],
+        "subject": [],
+        "updated_at": datetime(2021, 1, 2, 3, 4, 5),
+        "actions": [
+            {
+                "id": "a1",
+                "organization": {"id": "ocd-organization/lower"},
+                "description": "Introduced",
+                "date": "2021-01-01",
+                "classification": ["introduction"],
+                "order": 1,
+            },
+            {"id": "a2", "description": "Passed", "date": "2021-01-05", "order": 2},
+        ],
+        "sponsorships": [
+            {"id": "s1", "name": "Peña", "person": {"id": "ocd-person/1"}}
+        ],
+    },
+    {"id": "ocd-bill/2", "identifier": "HB 2", "title": "Another act"},
+]
+
+
+def test_export_bills_csv(tmp_path):
+    paths = export_bills(BILLS, tmp_path, name="AL_2021", batch_size=1)
+    assert paths[FileType.Actions].name == "AL_2021_bill_actions.csv"
+
+    with open(paths[FileType.Bills]) as f:
+        bills = list(csv.DictReader(f))
+    assert [b["identifier"] for b in bills] == ["HB 1", "HB 2"]
+    assert bills[0]["jurisdiction"] == "Alabama"
+    assert bills[0]["updated_at"] == "2021-01-02T03:04:05"
+
+    with open(paths[FileType.Actions]) as f:
+        actions = list(csv.DictReader(f))
+    assert [a["description"] for a in actions] == ["Introduced", "Passed"]
+    assert {a["bill_id"] for a in actions} == {"ocd-bill/1"}
+    assert actions[0]["organization_id"] == "ocd-organization/lower"
+
+    with open(paths[FileType.Sponsorships], encoding="utf-8") as f:
+        sponsorships = list(csv.DictReader(f))
+    assert sponsorships[0]["person_id"] == "ocd-person/1"
+    assert sponsorships[0]["name"] == "Peña"
+
+
+def test_export_bills_ndjson(tmp_path):
+    paths = export_bills(iter(BILLS), tmp_path, format="ndjson")
+    with open(paths[FileType.Bills]) as f:
+        bills = [json.loads(line) for line in f]
+    assert len(bills) == 2
+    assert bills[0]["actions"][1]["description"] == "Passed"
+
+
+def test_export_bills_parquet(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    paths = export_bills(BILLS, tmp_path, format="parquet", batch_size=1)
+    table = pq.read_table(paths[FileType.Actions])
+    assert table.column("description").to_pylist() == ["Introduced", "Passed"]
+
+
+def test_export_legislators(tmp_path):
+    people = [
+        {
+            "id": "ocd-person/1",
+            "name": "Jo Smith",
+            "party": "Independent",
+            "current_role": {"district": "7", "org_classification": "upper"},
+        }
+    ]
+    paths = export_legislators(people, tmp_path)
+    with open(paths[FileType.People]) as f:
+        rows = list(csv.DictReader(f))
+    assert rows[0]["current_district"] == "7"
+    assert rows[0]["current_chamber"] == "upper"
+
+    with pytest.raises(ValueError):
+        export_legislators(people, tmp_path, format="xlsx")
@@ -2,8 +2,11 @@
 
 """Unit tests for openstatesclient"""
 
+import os
+import subprocess
+import sys
 import pytest
-from datetime import datetime
+from datetime import date, datetime
 import pyopenstates
 
 
@@ -173,3 +176,317 @@ def testTimestampConversionInDict():
     """Timestamp conversion in a dictionary"""
     oh = pyopenstates.get_metadata(state="oh")
     assert isinstance(oh["latest_people_update"], datetime)
+
+
+def testLegislatorGeolocationMany(monkeypatch):
+    """Bulk geolocation dedupes rounded points and reuses the cache"""
+    calls = []
+
+    def fake_locate(lat, lng, fields=None, retries=0):
+        calls.append((lat, lng))
+        return [{"name": f"{lat},{lng}"}]
+
+    monkeypatch.setattr(pyopenstates.core, "locate_legislators", fake_locate)
+    points = [(35.79001, -78.78), (35.78999, -78.78), (36.0, -79.0)]
+    cache = {}
+    results = dict(
+        pyopenstates.locate_legislators_many(
+            points, precision=3, requests_per_second=None, cache=cache
+        )
+    )
+    assert len(calls) == 2
+    assert results[(35.79001, -78.78)] == [{"name": "35.79,-78.78"}]
+    assert results[(35.78999, -78.78)] == [{"name": "35.79,-78.78"}]
+    assert results[(36.0, -79.0)] == [{"name": "36.0,-79.0"}]
+
+    results = list(pyopenstates.locate_legislators_many(points[:1], 3, cache=cache))
+    assert len(calls) == 2
+    assert results == [((35.79001, -78.78), [{"name": "35.79,-78.78"}])]
+
+
+def testBillSearchResumesFromCheckpoint(monkeypatch, tmp_path):
+    """An interrupted all_pages search resumes from its checkpoint"""
+    requested = []
+    fail_on = {3}
+
+    def fake_get(uri, params=None, retries=0, backoff=1):
+        page = params["page"]
+        requested.append(page)
+        if page in fail_on:
+            fail_on.discard(page)
+            raise pyopenstates.APIError("temporarily unavailable")
+        return pyopenstates.core._convert_timestamps(
+            {
+                "results": [{"id": page, "updated_at": "2021-01-0%dT00:00" % page}],
+                "pagination": {"page": page, "max_page": 4},
+            }
+        )
+
+    monkeypatch.setattr(pyopenstates.core, "_get", fake_get)
+    monkeypatch.setattr(pyopenstates.core, "sleep", lambda s: None)
+    checkpoint = tmp_path / "bills.checkpoint"
+
+    with pytest.raises(pyopenstates.APIError):
+        pyopenstates.search_bills(state="nc", checkpoint=checkpoint)
+    assert checkpoint.exists()
+
+    results = pyopenstates.search_bills(state="nc", checkpoint=checkpoint)
+    assert requested == [1, 2, 3, 3, 4]
+    assert [r["id"] for r in results] == [1, 2, 3, 4]
+    assert all(isinstance(r["updated_at"], datetime) for r in results)
+    assert not checkpoint.exists()
+
+    checkpoint.write_text('{"params": {"jurisdiction": "oh"}}\n')
+    with pytest.raises(ValueError):
+        pyopenstates.search_bills(state="nc", checkpoint=checkpoint)
+
+
+def testImportIsLazy():
+    """Importing pyopenstates doesn't load heavy dependencies"""
+    code = (
+        "import sys, warnings\n"
+        "warnings.simplefilter('error')\n"
+        "import pyopenstates, pyopenstates.downloads, pyopenstates.districts\n"
+        "print(sorted({'requests', 'dateutil', 'pandas', 'shapely'} & set(sys.modules)))\n"
+    )
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    env.pop("OPENSTATES_API_KEY", None)
+    output = subprocess.run(
+        [sys.executable, "-c", code],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    assert output.strip() == "[]"
+    assert pyopenstates.search_bills is pyopenstates.core.search_bills
+
+    namespace = {}
+    exec("from pyopenstates import *", namespace)
+    assert namespace["search_bills"] is pyopenstates.core.search_bills
+    assert "API_ROOT" in namespace
+
+
+def testSessionCreatedOnce(monkeypatch):
+    """Concurrent first requests share a single session"""
+    from concurrent.futures import ThreadPoolExecutor
+
+    monkeypatch.setattr(pyopenstates.core, "_session", None)
+    with ThreadPoolExecutor(8) as executor:
+        sessions = list(
+            executor.map(
+                lambda _: pyopenstates.core._get_session(warn=False), range(32)
+            )
+        )
+    assert all(session is sessions[0] for session in sessions)
+
+
+def testHydrateBills(monkeypatch):
+    """Bill hydration fetches concurrently and skips unchanged cached bills"""
+    fetched = []
+
+    def fake_get_bill(uid, include=None, retries=0):
+        fetched.append(uid)
+        return {"id": uid, "updated_at": updated[uid], "include": include}
+
+    monkeypatch.setattr(pyopenstates.core, "get_bill", fake_get_bill)
+    updated = {f"ocd-bill/{i}": datetime(2021, 1, 1) for i in range(20)}
+    summaries = [{"id": uid, "updated_at": ts} for uid, ts in updated.items()]
+    cache = {}
+
+    details = list(
+        pyopenstates.hydrate_bills(
+            summaries, include="actions", requests_per_second=None, cache=cache
+        )
+    )
+    assert [d["id"] for d in details] == list(updated)
+    assert details[0]["include"] == "actions"
+    assert len(cache) == 20
+
+    fetched.clear()
+    updated["ocd-bill/3"] = datetime(2021, 2, 1)
+    summaries[3]["updated_at"] = updated["ocd-bill/3"]
+    details = list(
+        pyopenstates.hydrate_bills(
+            summaries + ["5"], requests_per_second=None, ordered=False, cache=cache
+        )
+    )
+    assert sorted(fetched) == ["ocd-bill/3", "ocd-bill/5"]
+    assert len(details) == 21
+    assert cache["ocd-bill/3"]["updated_at"] == datetime(2021, 2, 1)
+
+
+def testLegislatorGeolocationManyStopsEarly(monkeypatch):
+    """Bulk geolocation stops making requests when closed or on an error"""
+    calls = []
+
+    def fake_locate(lat, lng, fields=None, retries=0):
+        calls.append(lat)
+        if lat == 5:
+            raise pyopenstates.APIError("bad point")
+        return []
+
+    monkeypatch.setattr(pyopenstates.core, "locate_legislators", fake_locate)
+    points = [(i, 0) for i in range(100)]
+
+    results = pyopenstates.locate_legislators_many(
+        points[10:], max_workers=2, requests_per_second=None
+    )
+    next(results)
+    results.close()
+    assert len(calls) < 10
+
+    calls.clear()
+    with pytest.raises(pyopenstates.APIError):
+        list(
+            pyopenstates.locate_legislators_many(
+                points, max_workers=2, requests_per_second=None
+            )
+        )
+    assert len(calls) < 15
+
+
+@pytest.fixture
+def fake_responses(monkeypatch):
+    """
+    Replaces the API session with one returning a queued
+    ``(status_code, json)`` pair for each request
+    """
+    responses = []
+
+    class FakeResponse:
+        def __init__(self, url, status_code, data):
+            self.url = url
+            self.status_code = status_code
+            self.text = "error"
+            self.data = data
+
+        def json(self):
+            return self.data
+
+    class FakeSession:
+        def get(self, url, params=None):
+            return FakeResponse(url, *responses.pop(0))
+
+    monkeypatch.setattr(pyopenstates.core, "_session", FakeSession())
+    monkeypatch.setattr(pyopenstates.core, "sleep", lambda s: None)
+    return responses
+
+
+def testLegislatorGeolocationRetries(fake_responses):
+    """Bulk geolocation retries transient API errors"""
+    people = {"results": [{"name": "Jo Smith"}]}
+    fake_responses.extend([(503, None), (200, people)])
+    results = list(
+        pyopenstates.locate_legislators_many(
+            [(35.79, -78.78)], requests_per_second=None
+        )
+    )
+    assert results == [((35.79, -78.78), [{"name": "Jo Smith"}])]
+    assert fake_responses == []
+
+
+def testBillSearchCheckpointEdgeCases(monkeypatch, tmp_path):
+    """Checkpoints accept date parameters and ignore damaged writes"""
+    requested = []
+    fail_on = set()
+
+    def fake_get(uri, params=None, retries=0, backoff=1):
+        requested.append(params["page"])
+        if params["page"] in fail_on:
+            fail_on.discard(params["page"])
+            raise pyopenstates.APIError("temporarily unavailable")
+        return {
+            "results": [{"id": params["page"]}],
+            "pagination": {"page": params["page"], "max_page": 2},
+        }
+
+    monkeypatch.setattr(pyopenstates.core, "_get", fake_get)
+    monkeypatch.setattr(pyopenstates.core, "sleep", lambda s: None)
+    checkpoint = tmp_path / "bills.checkpoint"
+
+    results = pyopenstates.search_bills(
+        state="nc", updated_since=date(2021, 1, 1), checkpoint=checkpoint
+    )
+    assert [r["id"] for r in results] == [1, 2]
+
+    for header in ("", '{"params": {"jurisd'):
+        checkpoint.write_text(header)
+        results = pyopenstates.search_bills(state="nc", checkpoint=checkpoint)
+        assert [r["id"] for r in results] == [1, 2]
+        assert not checkpoint.exists()
+
+    # a partially written final page is discarded and fetched again
+    requested.clear()
+    fail_on.add(2)
+    with pytest.raises(pyopenstates.APIError):
+        pyopenstates.search_bills(state="nc", checkpoint=checkpoint)
+    with open(checkpoint, "a") as f:
+        f.write('{"page": 2, "max_pa')
+    results = pyopenstates.search_bills(state="nc", checkpoint=checkpoint)
+    assert [r["id"] for r in results] == [1, 2]
+    assert requested == [1, 2, 2]
+
+    with pytest.raises(ValueError):
+        pyopenstates.search_bills(state="nc", all_pages=False, checkpoint=checkpoint)
+
+
+def testIterBillsAndLegislators(monkeypatch):
+    """The paginated generators request every page with the given filters"""
+    requests = []
+
+    def fake_get(uri, params=None, retries=0, backoff=1):
+        requests.append((uri, dict(params)))
+        page = params["page"]
+        return {
+            "results": [{"id": f"{uri}{page}-{i}"} for i in range(2)],
+            "pagination": {"page": page, "max_page": 3},
+        }
+
+    monkeypatch.setattr(pyopenstates.core, "_get", fake_get)
+    monkeypatch.setattr(pyopenstates.core, "sleep", lambda s: None)
+
+    bills = pyopenstates.iter_bills(state="nc", identifier="HB 1", session="2021")
+    assert next(bills) == {"id": "bills/1-0"}
+    assert len(requests) == 1
+    assert len(list(bills)) == 5
+    assert [params["page"] for _, params in requests] == [1, 2, 3]
+    assert requests[0][1]["identifier"] == "HB 1"
+    assert requests[0][1]["jurisdiction"] == "nc"
+
+    requests.clear()
+    people = list(pyopenstates.iter_legislators(jurisdiction="nc", district="7"))
+    assert [p["id"] for p in people][-1] == "people3-1"
+    assert len(people) == 6
+    assert requests[0] == (
+        "people",
+        {"jurisdiction": "nc", "district": "7", "per_page": 50, "page": 1},
+    )
+
+
+def testHydrateBillsStreamsCachedBills(monkeypatch):
+    """Unchanged cached bills are yielded without waiting for the whole input"""
+    cache = {
+        f"ocd-bill/{i}": {"id": f"ocd-bill/{i}", "updated_at": i} for i in range(5)
+    }
+    consumed = []
+
+    def summaries():
+        for i in range(5):
+            consumed.append(i)
+            yield {"id": f"ocd-bill/{i}", "updated_at": i}
+
+    for ordered in (True, False):
+        consumed.clear()
+        details = pyopenstates.hydrate_bills(summaries(), ordered=ordered, cache=cache)
+        assert next(details)["id"] == "ocd-bill/0"
+        assert consumed == [0]
+        assert len(list(details)) == 4
+
+
+def testHydrateBillsRetries(fake_responses):
+    """Bill hydration retries transient API errors"""
+    fake_responses.extend([(429, None), (502, None), (200, {"id": "ocd-bill/1"})])
+    details = list(pyopenstates.hydrate_bills(["1"], requests_per_second=None))
+    assert details == [{"id": "ocd-bill/1"}]
+    assert fake_responses == []
@@ -0,0 +1,109 @@
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from pyopenstates import downloads
+from pyopenstates.downloads import FileType
+from pyopenstates.search import LocalSearchIndex
+
+FILES = {
+    "xx_2021_bills.csv": (
+        "id,identifier,title,subject\n"
+        "b1,HB 1,Relating to taxicab licensing,['Transportation']\n"
+        "b2,HB 2,Relating to school funding,['Education']\n"
+        'b3,SB 1,"Appropriations; schools, roads and taxes",[]\n'
+    ),
+    "xx_2021_bill_actions.csv": (
+        "id,bill_id,description\n"
+        "a1,b1,Introduced\n"
+        "a2,b2,Referred to Committee on Licensing\n"
+    ),
+    "xx_2021_bill_versions.csv": "id,bill_id,note\nv1,b3,Engrossed\n",
+}
+
+
+@pytest.fixture
+def bulk_data(monkeypatch, tmp_path):
+    """
+    Fakes bulk data downloads, returning the session URLs and a list that
+    records each URL lookup
+    """
+    urls = {"2021": "https://example.com/XX_2021.zip"}
+    lookups = []
+
+    def fake_get_download_url(state, session):
+        lookups.append(session)
+        return urls[session]
+
+    def fake_download_zip(url):
+        zip_path = downloads._zip_path(url)
+        files = dict(FILES)
+        if url.endswith("_v2.zip"):
+            files["xx_2021_bills.csv"] += "b4,HB 3,Relating to broadband,[]\n"
+        with zipfile.ZipFile(zip_path, "w") as zf:
+            for filename, data in files.items():
+                zf.writestr(filename, data)
+        return zip_path
+
+    monkeypatch.setattr(downloads, "TEMP_PATH", tmp_path)
+    monkeypatch.setattr(downloads, "_get_download_url", fake_get_download_url)
+    monkeypatch.setattr(downloads, "_download_zip", fake_download_zip)
+    return urls, lookups
+
+
+@pytest.fixture
+def index(bulk_data, tmp_path):
+    index = LocalSearchIndex(tmp_path / "search.sqlite")
+    yield index
+    index.close()
+
+
+def test_add_session(index, bulk_data):
+    urls, lookups = bulk_data
+    assert index.add_session("XX", "2021")
+    assert lookups == ["2021"]
+    # already indexed sessions aren't looked up again
+    assert not index.add_session("xx", "2021")
+    assert lookups == ["2021"]
+    assert index.sessions() == [("xx", "2021")]
+
+    urls["2021"] = "https://example.com/XX_2021_v2.zip"
+    assert index.add_session("xx", "2021", replace=True)
+    assert len(index.search("relating")) == 3
+
+
+def test_update_on_download(bulk_data, tmp_path):
+    urls, _ = bulk_data
+    index = LocalSearchIndex(tmp_path / "search.sqlite", update_on_download=True)
+    try:
+        index.add_session("xx", "2021")
+        assert index.search("broadband") == []
+
+        urls["2021"] = "https://example.com/XX_2021_v2.zip"
+        downloads.load_csv("xx", "2021", FileType.Bills)
+        assert [r["id"] for r in index.search("broadband")] == ["b4"]
+    finally:
+        index.close()
+    assert downloads._download_hooks == []
+
+
+def test_search(index):
+    index.add_session("xx", "2021")
+    results = index.search("licensed")
+    # stemmed matches, with title matches ranked above action matches
+    assert [r["identifier"] for r in results] == ["HB 1", "HB 2"]
+    assert results[0]["score"] > results[1]["score"]
+
+    assert {r["id"] for r in index.search("school")} == {"b2", "b3"}
+    assert [r["id"] for r in index.search("engrossed taxes")] == ["b3"]
+    assert [r["id"] for r in index.search('"HB 1" OR')] == []
+    assert index.search("school", state="yy") == []
+    assert len(index.search("school", state="XX", session="2021")) == 2
+    assert index.search("  ") == []
+
+
+def test_search_from_threads(index):
+    index.add_session("xx", "2021")
+    with ThreadPoolExecutor(4) as executor:
+        results = list(executor.map(index.search, ["school"] * 8))
+    assert all(len(r) == 2 for r in results)